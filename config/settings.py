@@ -26,3 +26,66 @@ TRIGGER_LINES = {
     'A13': (1147, 665), # End line point 1  
     'B13': (1378, 763), # End line point 2
 }
+
+# Adaptivní kvalita detekce při zatížení (throttling Pi)
+QUALITY_SETTINGS = {
+    'enabled': True,
+    'frame_budget_s': None,        # None = 1 / CAMERA_SETTINGS['fps']
+    'degrade_ratio': 1.0,          # Zhoršit když EMA > budget * ratio
+    'recover_ratio': 0.6,          # Zlepšit když EMA < budget * ratio
+    'hold_frames': 15,             # Kolik framů musí podmínka trvat
+    'ema_alpha': 0.2,
+    'measuring_pin_timeout_s': 10.0,  # Max. doba pinu na plnou kvalitu během měření
+    # Úroveň 0 = plná kvalita, každá další je levnější
+    'levels': [
+        {'max_corners': 200, 'max_level': 2, 'scale': 1.0,  'stride': 1},
+        {'max_corners': 150, 'max_level': 2, 'scale': 0.75, 'stride': 1},
+        {'max_corners': 100, 'max_level': 1, 'scale': 0.5,  'stride': 1},
+        {'max_corners': 80,  'max_level': 1, 'scale': 0.5,  'stride': 2},
+        {'max_corners': 60,  'max_level': 0, 'scale': 0.4,  'stride': 3},
+    ],
+}
+
+# Rolling pre-roll archiv na disku (memory-mapped kruhový soubor)
+ARCHIVE_SETTINGS = {
+    'enabled': False,
+    'path': 'archive/preroll.bin',
+    'slots': 1800,                 # 1800 slotů * stride 2 = 2 minuty při 30 FPS
+    'resolution': (1152, 648),     # Poloviční rozlišení (~2.2 MB/frame, ~4 GB)
+    'stride': 2,                   # Ukládat každý N-tý frame
+}
+
+# Paralelní zpracování optical flow po dlaždicích (jedna na pre-detection zónu)
+TILE_SETTINGS = {
+    'enabled': True,
+    'halo_px': 150,                # Okraj kolem zóny, aby se blob neuřízl
+    'workers': 4,                  # Pi 5 má 4 jádra, OpenCV uvolňuje GIL
+}
+
+# Virtuální čáry pro měření (libovolný počet, pořadí = priorita při překryvu)
+# 'lanes': None = platí pro všechny pruhy, jinak seznam názvů pruhů
+CROSSING_LINES = [
+    {'name': 'start_line', 'point1': (300, 750), 'point2': (600, 1280), 'world_y': 0.0, 'lanes': None},
+    {'name': 'end_line', 'point1': (900, 570), 'point2': (1600, 850), 'world_y': 12.0, 'lanes': None},
+]
+
+# Pruhy - hranice seřazené napříč silnicí (N+1 hranic = N pruhů)
+ROAD_LANES = {
+    'boundaries': [
+        ((300, 750), (900, 570)),     # Vzdálený okraj silnice
+        ((600, 1280), (1600, 850)),   # Bližší okraj silnice
+    ],
+    'names': ['lane_1'],
+}
+
+# Binární log detekcí pro offline sweep parametrů (python -m modules.parameter_sweep)
+DETECTION_LOG_SETTINGS = {
+    'enabled': False,
+    'path': 'logs/detections.bin',
+}
+
+# Měřené úseky = dvojice čar z CROSSING_LINES (pořadí nehraje roli)
+# 'lanes': None = všechny pruhy, jinak seznam názvů pruhů z ROAD_LANES
+MEASUREMENT_SEGMENTS = [
+    {'name': 'main', 'lines': ('start_line', 'end_line'), 'lanes': None},
+]
@@ -6,6 +6,10 @@ from modules.camera_manager import CameraManager
 from modules.coordinate_system import CoordinateSystem  
 from modules.optical_flow_detector import OpticalFlowDetector
 from modules.speed_calculator import SpeedCalculator
+from modules.quality_controller import QualityController
+from modules.frame_archive import FrameArchive
+from modules.detection_log import DetectionLog
+from config.settings import ARCHIVE_SETTINGS, DETECTION_LOG_SETTINGS
 
 class TrafficMonitor:
     def __init__(self):
@@ -13,13 +17,30 @@ class TrafficMonitor:
         print("   Using Optical Flow detection (ignores parked cars)")
         
         self.coord_system = CoordinateSystem()
-        self.camera = CameraManager(fps=30, buffer_size=450)
+        self.camera = CameraManager(fps=30, buffer_size=450, archive=self._create_archive())
         self.motion_detector = OpticalFlowDetector(self.coord_system)
         self.speed_calculator = SpeedCalculator(self.coord_system)
+        self.quality_controller = QualityController(self.motion_detector)
+        self.detection_log = None
+        self.measurement_quality_level = 0
+        if DETECTION_LOG_SETTINGS['enabled']:
+            self.detection_log = DetectionLog(DETECTION_LOG_SETTINGS['path'])
         
         print("✅ Traffic Monitor initialized")
         print("📝 Single vehicle mode - optical flow tracking\n")
     
+    def _create_archive(self):
+        """Vytvoří diskový pre-roll archiv, pokud je zapnutý"""
+        if not ARCHIVE_SETTINGS['enabled']:
+            return None
+        width, height = ARCHIVE_SETTINGS['resolution']
+        return FrameArchive(
+            ARCHIVE_SETTINGS['path'],
+            slot_count=ARCHIVE_SETTINGS['slots'],
+            frame_shape=(height, width, 3),
+            stride=ARCHIVE_SETTINGS['stride']
+        )
+    
     def start_monitoring(self):
         """Spustí hlavní monitoring loop"""
         print("🔄 Starting traffic monitoring...")
@@ -34,6 +55,8 @@ class TrafficMonitor:
             print("\n⚠️ Monitoring interrupted by user")
         finally:
             self.camera.stop()
+            if self.detection_log:
+                self.detection_log.close()
             self._print_summary()
     
     def _monitoring_loop(self):
@@ -50,36 +73,81 @@ class TrafficMonitor:
             timestamp = frame_data['timestamp']
             frame_count += 1
             
+            # Frame stride při degradované kvalitě
+            if not self.quality_controller.should_process(frame_count):
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+                continue
+            
+            process_start = time.perf_counter()
+            
             # Detekce POUZE pohybujících se vozidel
             detections, motion_mask = self.motion_detector.detect_moving_vehicles(frame)
             
+            # Trigger lines a pruhy pro všechny detekce jedním vektorovým voláním
+            if len(detections):
+                detections['line'], detections['lane'] = self.coord_system.evaluate_crossings(
+                    detections['center'], threshold=self.speed_calculator.trigger_threshold
+                )
+            
+            if self.detection_log:
+                self.detection_log.append(timestamp, frame_count, detections)
+            
             display_frame = frame.copy()
+            vehicle_in_zone = False
+            
+            # Úroveň kvality, se kterou byl tento frame zpracován
+            frame_quality_level = self.quality_controller.get_level()
             
             # Zpracování - vezmi největší detekci
-            if detections:
-                detections.sort(key=lambda d: d['area'], reverse=True)
-                detection = detections[0]
+            if len(detections):
+                detection = detections[np.argmax(detections['area'])]
+                center = (int(detection['center'][0]), int(detection['center'][1]))
                 
                 # Aktualizuj speed calculator
+                state_before = self.speed_calculator.get_state()
                 speed_data = self.speed_calculator.update_position(
-                    detection['center'], timestamp
+                    center, timestamp,
+                    line_index=int(detection['line']), lane_index=int(detection['lane']),
+                    world_pos=detection['world']
                 )
                 
+                # Nejhorší kvalita během měření (od START crossingu)
+                if state_before == 'IDLE':
+                    self.measurement_quality_level = frame_quality_level
+                else:
+                    self.measurement_quality_level = max(self.measurement_quality_level,
+                                                         frame_quality_level)
+                if speed_data:
+                    speed_data['quality_level'] = self.measurement_quality_level
+                
+                # Plná kvalita už od pre-detection zóny (před START crossingem)
+                vehicle_in_zone = self.coord_system.is_in_predetection_area(*center)
+                
                 # Vykreslení
                 self._draw_detection(display_frame, detection, speed_data)
             
             # Zobrazení
             self._display_frame(display_frame, motion_mask, frame_count)
             
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            key = cv2.waitKey(1) & 0xFF
+            
+            # Měří se celá iterace (detekce + vykreslení + imshow), pin i během MEASURING
+            self.quality_controller.update(
+                time.perf_counter() - process_start, vehicle_in_zone,
+                measuring=self.speed_calculator.get_state() == 'MEASURING',
+                timestamp=timestamp
+            )
+            
+            if key == ord('q'):
                 break
     
     def _draw_detection(self, frame, detection, speed_data):
         """Vykreslí detekci na frame"""
-        x, y, w, h = detection['bbox']
-        center = detection['center']
-        world_pos = detection['world_pos']
-        motion_mag = detection['motion_magnitude']
+        x, y, w, h = (int(v) for v in detection['bbox'])
+        center = (int(detection['center'][0]), int(detection['center'][1]))
+        world_pos = detection['world']
+        motion_mag = detection['motion']
         
         # Bounding box - barva podle stavu
         state = self.speed_calculator.get_state()
@@ -115,19 +183,15 @@ class TrafficMonitor:
         """Vykreslí všechny zóny"""
         trigger_lines = self.coord_system.get_trigger_line_coordinates()
         
-        # START LINE - červená (TLUSTÁ)
-        start_line = trigger_lines['start_line']
-        cv2.line(frame, start_line['point1'], start_line['point2'], (0, 0, 255), 5)
-        cv2.putText(frame, "START", 
-                   (start_line['point1'][0]+20, start_line['point1'][1]-15),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 3)
-        
-        # END LINE - zelená (TLUSTÁ)
-        end_line = trigger_lines['end_line']
-        cv2.line(frame, end_line['point1'], end_line['point2'], (0, 255, 0), 5)
-        cv2.putText(frame, "END", 
-                   (end_line['point1'][0]+20, end_line['point1'][1]-15),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 3)
+        # START - červená, END - zelená, ostatní čáry - oranžová (TLUSTÉ)
+        line_colors = {'start_line': (0, 0, 255), 'end_line': (0, 255, 0)}
+        for name, line in trigger_lines.items():
+            color = line_colors.get(name, (0, 165, 255))
+            label = name.replace('_line', '').upper()
+            cv2.line(frame, line['point1'], line['point2'], color, 5)
+            cv2.putText(frame, label, 
+                       (line['point1'][0]+20, line['point1'][1]-15),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 3)
         
         # 🎯 MEASUREMENT ZONE - žlutý polygon (mezi trigger lines)
         measurement_zone = self.coord_system.get_measurement_zone()
@@ -166,6 +230,11 @@ class TrafficMonitor:
         cv2.putText(frame_resized, state_text, (10, 90),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
         
+        quality = self.quality_controller.get_status()
+        quality_text = f"Quality: L{quality['level']} ({quality['avg_frame_ms']:.0f}/{quality['budget_ms']:.0f} ms)"
+        cv2.putText(frame_resized, quality_text, (10, 120),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+        
         cv2.imshow("Traffic Monitor", frame_resized)
         cv2.imshow("Motion Detection (Optical Flow)", motion_resized)
     
@@ -175,6 +244,7 @@ class TrafficMonitor:
         print(f"📊 MONITORING SUMMARY")
         print(f"{'='*60}")
         print(f"Total vehicles measured: {self.speed_calculator.get_vehicle_count()}")
+        print(f"Quality changes: {len(self.quality_controller.get_decisions())}")
         print(f"{'='*60}\n")
 
 if __name__ == "__main__":
@@ -7,14 +7,16 @@ from collections import deque
 import numpy as np
 
 class CameraManager:
-    def __init__(self, fps=30, buffer_size=450):  # 3 sekundy při 50 FPS
+    def __init__(self, fps=30, buffer_size=450, archive=None):  # 3 sekundy při 50 FPS
         """
         fps: Tvých 50 FPS
         buffer_size: Kolik framů držet v paměti
+        archive: Volitelný FrameArchive pro dlouhý pre-roll na disku
         """
         self.picam2 = Picamera2()
         self.fps = fps
         self.buffer_size = buffer_size
+        self.archive = archive
         
         # Kruhový buffer pro framy
         self.frame_buffer = deque(maxlen=buffer_size)
@@ -43,6 +45,8 @@ class CameraManager:
         """Spustí kontinuální snímání do bufferu"""
         if not self.running:
             self.picam2.start()
+            if self.archive:
+                self.archive.start()
             self.running = True
             self.capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
             self.capture_thread.start()
@@ -54,6 +58,8 @@ class CameraManager:
         if self.capture_thread:
             self.capture_thread.join(timeout=2)
         self.picam2.stop()
+        if self.archive:
+            self.archive.stop()
         print("✓ Camera streaming stopped")
     
     def _capture_loop(self):
@@ -70,13 +76,18 @@ class CameraManager:
                     self.actual_fps = len(self.frame_times) / time_span if time_span > 0 else 0
                 
                 # Přidání do bufferu s timestampem
+                frame_copy = frame.copy()
                 with self.buffer_lock:
                     self.frame_buffer.append({
-                        'frame': frame.copy(),
+                        'frame': frame_copy,
                         'timestamp': current_time,
                         'frame_id': len(self.frame_buffer)
                     })
                 
+                # Zápis do diskového archivu běží ve vlastním threadu
+                if self.archive:
+                    self.archive.append(frame_copy, current_time)
+                
                 # Malá pauza pro stability
                 time.sleep(0.001)
                 
@@ -111,3 +122,9 @@ class CameraManager:
                        if start_time <= f['timestamp'] <= end_time]
         
         return sequence
+    
+    def get_archived_frames(self, start_time, end_time):
+        """Vrátí framy z diskového archivu - pre-roll daleko za hranicí RAM bufferu"""
+        if not self.archive:
+            return []
+        return self.archive.get_frames(start_time, end_time)
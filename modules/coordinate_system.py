@@ -3,25 +3,46 @@
 import cv2
 import numpy as np
 from pathlib import Path
+from config.settings import CAMERA_SETTINGS, CROSSING_LINES, ROAD_LANES
 
 class CoordinateSystem:
-    def __init__(self, homography_file="config/homography_matrix.txt"):
+    def __init__(self, homography_file="config/homography_matrix.txt",
+                 crossing_lines=None, road_lanes=None):
         """Načte homografii a inicializuje souřadnicový systém"""
         self.H = np.loadtxt(homography_file)
         
-    
+        crossing_lines = CROSSING_LINES if crossing_lines is None else crossing_lines
+        road_lanes = ROAD_LANES if road_lanes is None else road_lanes
+        
         self.trigger_lines = {
-            'start_line': {
-                'point1': (300, 750),   # Levý okraj 
-                'point2': (600, 1280),  # Pravý okraj 
-                'world_y': 0.0
-            },
-            'end_line': {
-                'point1': (900, 570),   # Levý okraj 
-                'point2': (1600, 850),  # Pravý okraj 
-                'world_y': 12.0
+            line['name']: {
+                'point1': tuple(line['point1']),
+                'point2': tuple(line['point2']),
+                'world_y': line['world_y']
             }
+            for line in crossing_lines
         }
+        self.line_names = [line['name'] for line in crossing_lines]
+        self.lane_names = list(road_lanes['names'])
+        if not self.lane_names or len(road_lanes['boundaries']) != len(self.lane_names) + 1:
+            raise ValueError("ROAD_LANES needs at least one lane and one more boundary than lanes")
+        
+        # Koeficienty všech přímek (trigger lines + hranice pruhů) pro jeden maticový výpočet
+        self.line_coeffs = self._line_coefficients(
+            [(line['point1'], line['point2']) for line in crossing_lines]
+        )
+        self.lane_coeffs = self._lane_coefficients(road_lanes['boundaries'])
+        self.all_coeffs = np.vstack([self.line_coeffs, self.lane_coeffs])
+        
+        # Které čáry platí pro který pruh (řádek = čára, sloupec = pruh)
+        self.validate_lane_names(
+            [lane for line in crossing_lines for lane in (line.get('lanes') or [])],
+            "CROSSING_LINES"
+        )
+        self.line_lane_mask = np.array([
+            [line.get('lanes') is None or lane in line['lanes'] for lane in self.lane_names]
+            for line in crossing_lines
+        ], dtype=bool).reshape(len(crossing_lines), len(self.lane_names))
         
         
         self.predetection_polygon_1 = np.array([
@@ -39,15 +60,23 @@ class CoordinateSystem:
         ], dtype=np.int32)
         
         # Obdélník pokrývající celou oblast měření
+        # Čtyřúhelník mezi krajními čarami (nejmenší a největší world_y)
+        first = min(crossing_lines, key=lambda line: line['world_y'])
+        last = max(crossing_lines, key=lambda line: line['world_y'])
         self.measurement_zone = np.array([
-            [300, 750],    # START LINE levý
-            [900, 570],    # END LINE levý
-            [1600, 850],   # END LINE pravý
-            [600, 1280]    # START LINE pravý
+            first['point1'],   # START LINE levý
+            last['point1'],    # END LINE levý
+            last['point2'],    # END LINE pravý
+            first['point2']    # START LINE pravý
         ], dtype=np.int32)
         
+        # Rasterizované pre-detection zóny pro vektorový lookup středů
+        width, height = CAMERA_SETTINGS['resolution']
+        self.predetection_mask = np.zeros((height, width), dtype=np.uint8)
+        cv2.fillPoly(self.predetection_mask, self.get_predetection_polygons(), 1)
+        
         print(f"✓ Loaded homography matrix from {homography_file}")
-        print(f"✓ Trigger lines: START & END extended to full road width")
+        print(f"✓ Trigger lines: {len(self.line_names)} | Lanes: {len(self.lane_names)}")
         print(f"✓ Pre-detection: 2 zones | Measurement: 1 zone")
         
     def pixel_to_world(self, pixel_x, pixel_y):
@@ -55,6 +84,13 @@ class CoordinateSystem:
         pixel_pt = np.array([[[pixel_x, pixel_y]]], dtype=np.float32)
         world_pt = cv2.perspectiveTransform(pixel_pt, self.H)
         return world_pt[0][0]
+    
+    def pixels_to_world(self, points):
+        """Převede pole bodů (N, 2) na metry jedním voláním"""
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 1, 2)
+        if len(points) == 0:
+            return np.empty((0, 2), dtype=np.float32)
+        return cv2.perspectiveTransform(points, self.H).reshape(-1, 2)
         
     def calculate_distance(self, pos1, pos2):
         """Spočítá vzdálenost mezi dvěma body v metrech"""
@@ -73,6 +109,67 @@ class CoordinateSystem:
         distance = abs(A*x0 + B*y0 + C) / np.sqrt(A*A + B*B)
         return distance
     
+    @staticmethod
+    def _line_coefficients(lines):
+        """Normalizované koeficienty (A, B, C) přímek - A*x + B*y + C = signed vzdálenost"""
+        coeffs = np.zeros((len(lines), 3), dtype=np.float64)
+        for i, ((x1, y1), (x2, y2)) in enumerate(lines):
+            A = y2 - y1
+            B = x1 - x2
+            C = x2*y1 - x1*y2
+            coeffs[i] = np.array([A, B, C], dtype=np.float64) / np.sqrt(A*A + B*B)
+        return coeffs
+    
+    def _lane_coefficients(self, boundaries):
+        """Koeficienty hranic pruhů orientované tak, aby směr napříč silnicí byl kladný"""
+        coeffs = self._line_coefficients(boundaries)
+        centers = np.array([np.mean(b, axis=0) for b in boundaries], dtype=np.float64)
+        for i in range(len(boundaries)):
+            # Referenční bod = střed další hranice (u poslední předchozí, s opačným znaménkem)
+            if i + 1 < len(boundaries):
+                ref, sign = centers[i + 1], 1.0
+            else:
+                ref, sign = centers[i - 1], -1.0
+            if sign * (coeffs[i, :2] @ ref + coeffs[i, 2]) < 0:
+                coeffs[i] = -coeffs[i]
+        return coeffs
+    
+    def validate_lane_names(self, lanes, source):
+        """Vyhodí ValueError pro názvy pruhů, které nejsou v ROAD_LANES"""
+        unknown = sorted(set(lanes) - set(self.lane_names))
+        if unknown:
+            raise ValueError(f"{source} uses unknown lanes {unknown} "
+                             f"(known: {self.lane_names})")
+    
+    def signed_line_distances(self, points):
+        """Signed vzdálenosti bodů (N, 2) od všech přímek najednou -> (N, čáry + hranice)"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        return points @ self.all_coeffs[:, :2].T + self.all_coeffs[:, 2]
+    
+    def evaluate_crossings(self, points, threshold=50):
+        """
+        Jeden průchod pro všechny body: překročená čára a pruh
+        Vrátí (index čáry nebo -1, index pruhu nebo -1) pro každý bod
+        """
+        distances = self.signed_line_distances(points)
+        n_lines = len(self.line_names)
+        line_dist = np.abs(distances[:, :n_lines])
+        lane_dist = distances[:, n_lines:]
+        
+        # Pruh = počet hranic, za kterými bod leží, mínus 1
+        lanes = np.sum(lane_dist >= 0, axis=1) - 1
+        lanes[(lanes < 0) | (lanes >= len(self.lane_names))] = -1
+        
+        # Čára musí být blízko a platit pro pruh vozidla
+        near = line_dist < threshold
+        near &= np.where(lanes[:, None] >= 0,
+                         self.line_lane_mask.T[np.maximum(lanes, 0)],
+                         True)
+        
+        # Při překryvu vyhrává první čára v pořadí konfigurace
+        crossed = np.where(near.any(axis=1), np.argmax(near, axis=1), -1)
+        return crossed, lanes
+    
     def is_near_trigger_line(self, pixel_x, pixel_y, line_name='start_line', threshold=50):
         """Kontrola zda je bod blízko trigger line"""
         line = self.trigger_lines[line_name]
@@ -85,11 +182,18 @@ class CoordinateSystem:
     
     def which_trigger_line_crossed(self, pixel_x, pixel_y, threshold=50):
         """Vrátí kterou trigger linii vozidlo překročilo"""
-        if self.is_near_trigger_line(pixel_x, pixel_y, 'start_line', threshold):
-            return 'start_line'
-        elif self.is_near_trigger_line(pixel_x, pixel_y, 'end_line', threshold):
-            return 'end_line'
-        return None
+        crossed, _ = self.evaluate_crossings([(pixel_x, pixel_y)], threshold)
+        if crossed[0] < 0:
+            return None
+        return self.line_names[crossed[0]]
+    
+    def get_line_name(self, line_index):
+        """Název čáry podle indexu (None pro -1)"""
+        return self.line_names[line_index] if line_index >= 0 else None
+    
+    def get_lane_name(self, lane_index):
+        """Název pruhu podle indexu (None pro -1)"""
+        return self.lane_names[lane_index] if lane_index >= 0 else None
     
     def is_in_predetection_area(self, pixel_x, pixel_y):
         """Kontrola zda je bod v pre-detection zóně"""
@@ -105,6 +209,16 @@ class CoordinateSystem:
             
         return False
     
+    def in_predetection_area(self, points):
+        """Vektorová verze is_in_predetection_area pro pole bodů (N, 2)"""
+        points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+        height, width = self.predetection_mask.shape
+        inside = ((points[:, 0] >= 0) & (points[:, 0] < width) &
+                  (points[:, 1] >= 0) & (points[:, 1] < height))
+        result = np.zeros(len(points), dtype=bool)
+        result[inside] = self.predetection_mask[points[inside, 1], points[inside, 0]] > 0
+        return result
+    
     def is_in_measurement_zone(self, pixel_x, pixel_y):
         point = (pixel_x, pixel_y)
         result = cv2.pointPolygonTest(self.measurement_zone, point, False)
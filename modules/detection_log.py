@@ -0,0 +1,81 @@
+# modules/detection_log.py
+
+import os
+import numpy as np
+from modules.detection_records import DETECTION_DTYPE
+
+# Layout souboru: [16 B header | záznamy LOG_DTYPE ...] - append-only, memory-mappable
+LOG_MAGIC = b'TDETLOG1'
+LOG_VERSION = 2
+HEADER_DTYPE = np.dtype([('magic', 'S8'), ('version', '<u4'), ('record_size', '<u4')])
+
+# Jeden záznam = jedna detekce + čas a index framu, ve kterém byla nalezena
+LOG_DTYPE = np.dtype(
+    [('timestamp', '<f8'), ('frame_index', '<i8')] +
+    [(name, DETECTION_DTYPE.fields[name][0]) for name in DETECTION_DTYPE.names]
+)
+
+class DetectionLog:
+    def __init__(self, path):
+        """Kompaktní binární log detekcí pro offline ladění parametrů"""
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not is_new:
+            self._check_header(path)
+            # Useknutí neúplného záznamu po pádu, aby nové zápisy byly zarovnané
+            body = os.path.getsize(path) - HEADER_DTYPE.itemsize
+            if body % LOG_DTYPE.itemsize:
+                os.truncate(path, os.path.getsize(path) - body % LOG_DTYPE.itemsize)
+
+        self.file = open(path, 'ab')
+        if is_new:
+            header = np.zeros(1, dtype=HEADER_DTYPE)
+            header['magic'] = LOG_MAGIC
+            header['version'] = LOG_VERSION
+            header['record_size'] = LOG_DTYPE.itemsize
+            self.file.write(header.tobytes())
+
+        self.records_written = 0
+        print(f"✓ Detection log: {path} ({LOG_DTYPE.itemsize} B/detection)")
+
+    @staticmethod
+    def _check_header(path):
+        """Ověří, že soubor je detection log kompatibilní verze"""
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if (len(header) == 0 or header['magic'][0] != LOG_MAGIC
+                or header['version'][0] != LOG_VERSION
+                or header['record_size'][0] != LOG_DTYPE.itemsize):
+            raise ValueError(f"{path} is not a compatible detection log")
+
+    def append(self, timestamp, frame_index, detections):
+        """Zapíše všechny detekce jednoho framu"""
+        if len(detections) == 0:
+            return
+        records = np.empty(len(detections), dtype=LOG_DTYPE)
+        records['timestamp'] = timestamp
+        records['frame_index'] = frame_index
+        for name in DETECTION_DTYPE.names:
+            records[name] = detections[name]
+        self.file.write(records.tobytes())
+        self.records_written += len(records)
+
+    def close(self):
+        """Flushne a zavře log"""
+        if not self.file.closed:
+            self.file.close()
+            print(f"✓ Detection log closed ({self.records_written} detections written)")
+
+    @staticmethod
+    def load(path):
+        """Namapuje log pouze pro čtení - vrátí pole záznamů LOG_DTYPE (zero-copy)"""
+        DetectionLog._check_header(path)
+        # Neúplný poslední záznam (pád při zápisu) se ignoruje
+        count = (os.path.getsize(path) - HEADER_DTYPE.itemsize) // LOG_DTYPE.itemsize
+        if count <= 0:
+            return np.empty(0, dtype=LOG_DTYPE)
+        return np.memmap(path, dtype=LOG_DTYPE, mode='r',
+                         offset=HEADER_DTYPE.itemsize, shape=(count,))
@@ -0,0 +1,79 @@
+# modules/detection_records.py
+
+import cv2
+import numpy as np
+
+# Jedna detekce = jeden záznam, celý frame = jedno pole (bez dictů per objekt)
+DETECTION_DTYPE = np.dtype([
+    ('bbox', '<i4', (4,)),     # x, y, w, h v pixelech plného rozlišení
+    ('center', '<i4', (2,)),   # Střed bboxu v pixelech
+    ('world', '<f4', (2,)),    # Pozice v metrech (homografie)
+    ('area', '<f4'),           # Plocha blobu v pixelech plného rozlišení
+    ('aspect', '<f4'),         # max(w, h) / min(w, h)
+    ('motion', '<f4'),         # Průměrný pohyb v px/frame (0 pokud není k dispozici)
+    ('line', '<i2'),           # Index překročené trigger line (-1 = žádná)
+    ('lane', '<i2'),           # Index pruhu (-1 = mimo pruhy)
+])
+
+def empty_detections():
+    """Prázdné pole detekcí"""
+    return np.empty(0, dtype=DETECTION_DTYPE)
+
+def extract_blobs(mask, coord_system, min_area, max_area, max_aspect=None,
+                  motion_map=None, scale=1.0, offset=(0, 0)):
+    """
+    Najde bloby v binární masce pomocí connected components a vrátí pole detekcí
+    mask: Binární maska (uint8) ve zpracovacím rozlišení
+    motion_map: Volitelná mapa pohybu (stejný tvar jako mask) pro průměrný pohyb blobu
+    scale: Poměr zpracovacího a plného rozlišení
+    offset: Posun masky (x, y) ve zpracovacím rozlišení, pokud jde o výřez framu
+    """
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    if count <= 1:
+        return empty_detections()
+
+    # Label 0 je pozadí
+    labels_idx = np.arange(1, count)
+    label_stats = stats[1:]
+
+    # Převod do plného rozlišení
+    x = ((label_stats[:, cv2.CC_STAT_LEFT] + offset[0]) / scale).astype(np.int32)
+    y = ((label_stats[:, cv2.CC_STAT_TOP] + offset[1]) / scale).astype(np.int32)
+    w = (label_stats[:, cv2.CC_STAT_WIDTH] / scale).astype(np.int32)
+    h = (label_stats[:, cv2.CC_STAT_HEIGHT] / scale).astype(np.int32)
+    area = label_stats[:, cv2.CC_STAT_AREA] / (scale * scale)
+
+    # Filtr velikosti a aspect ratio
+    short_side = np.minimum(w, h)
+    aspect = np.where(short_side > 0, np.maximum(w, h) / np.maximum(short_side, 1), 0.0)
+    keep = (area > min_area) & (area < max_area)
+    if max_aspect is not None:
+        keep &= aspect <= max_aspect
+
+    center_x = x + w // 2
+    center_y = y + h // 2
+    centers = np.stack([center_x, center_y], axis=1)
+
+    # 🎯 KONTROLA PRE-DETECTION POLYGONŮ
+    keep &= coord_system.in_predetection_area(centers)
+    if not np.any(keep):
+        return empty_detections()
+
+    detections = np.zeros(np.count_nonzero(keep), dtype=DETECTION_DTYPE)
+    detections['bbox'] = np.stack([x, y, w, h], axis=1)[keep]
+    detections['center'] = centers[keep]
+    detections['world'] = coord_system.pixels_to_world(centers[keep])
+    detections['area'] = area[keep]
+    detections['aspect'] = aspect[keep]
+    # Čáru a pruh doplní CoordinateSystem.evaluate_crossings v hlavní smyčce
+    detections['line'] = -1
+    detections['lane'] = -1
+
+    if motion_map is not None:
+        # Průměr mapy pohybu jen pro ponechané bloby, jen v jejich bounding boxu
+        for i, label in enumerate(labels_idx[keep]):
+            bx, by, bw, bh, _ = stats[label]
+            blob = labels[by:by+bh, bx:bx+bw] == label
+            detections['motion'][i] = motion_map[by:by+bh, bx:bx+bw][blob].mean()
+
+    return detections
@@ -0,0 +1,250 @@
+# modules/frame_archive.py
+
+import os
+import queue
+import threading
+import cv2
+import numpy as np
+from config.settings import CAMERA_SETTINGS
+
+# Layout souboru: [header | index | padding | frame sloty]
+ARCHIVE_MAGIC = 0x5446524D41524331  # "TFRMARC1"
+ARCHIVE_VERSION = 1
+HEADER_FIELDS = 8  # magic, version, slots, height, width, channels, next_seq, reserved
+INDEX_DTYPE = np.dtype([('seq', '<i8'), ('timestamp', '<f8')])
+PAGE_SIZE = 4096
+
+class FrameArchive:
+    def __init__(self, path, slot_count, frame_shape, stride=1, queue_size=16):
+        """
+        Rolling pre-roll archiv na disku - memory-mapped kruhový soubor
+        path: Cesta k souboru archivu
+        slot_count: Počet frame slotů v kruhu
+        frame_shape: (výška, šířka, kanály) ukládaných framů
+        stride: Ukládat jen každý N-tý frame
+        queue_size: Max. framů (už ve velikosti archivu) čekajících na zápis
+        """
+        self.path = path
+        self.slot_count = slot_count
+        self.frame_shape = tuple(frame_shape)
+        self.stride = max(1, stride)
+        self._compute_layout()
+
+        resumed = self._open_file()
+        self.next_seq = int(self.header[6])
+
+        # Writer thread
+        self.write_queue = queue.Queue(maxsize=queue_size)
+        self.writer_thread = None
+        self.running = False
+        self.frames_seen = 0
+        self.frames_dropped = 0
+        self.write_errors = 0
+
+        fps = CAMERA_SETTINGS['fps']
+        minutes = slot_count * self.stride / fps / 60.0
+        state = f"resumed at seq {self.next_seq}" if resumed else "created"
+        print(f"✓ Frame archive {state}: {path} "
+              f"({slot_count} slots, {self.file_size / 1e9:.1f} GB, ~{minutes:.1f} min @ {fps}FPS)")
+
+    def _compute_layout(self):
+        """Spočítá offsety indexu a frame slotů v souboru"""
+        self.index_offset = HEADER_FIELDS * 8
+        index_end = self.index_offset + self.slot_count * INDEX_DTYPE.itemsize
+        self.frames_offset = (index_end + PAGE_SIZE - 1) // PAGE_SIZE * PAGE_SIZE
+        self.slot_bytes = int(np.prod(self.frame_shape))
+        self.file_size = self.frames_offset + self.slot_count * self.slot_bytes
+
+    def _open_file(self):
+        """Otevře existující archiv se stejnou geometrií, jinak vytvoří nový"""
+        height, width, channels = self.frame_shape
+        expected = [ARCHIVE_MAGIC, ARCHIVE_VERSION, self.slot_count, height, width, channels]
+
+        resumed = False
+        if os.path.exists(self.path) and os.path.getsize(self.path) == self.file_size:
+            header = np.memmap(self.path, dtype='<i8', mode='r', shape=(HEADER_FIELDS,))
+            resumed = list(header[:6]) == expected
+            del header
+
+        if not resumed:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            open(self.path, 'wb').close()
+
+        # Skutečně alokuj místo - zápis do sparse souboru na plném disku = SIGBUS
+        try:
+            with open(self.path, 'r+b') as f:
+                os.posix_fallocate(f.fileno(), 0, self.file_size)
+        except OSError as e:
+            # Částečně alokovaný nový soubor by zbytečně držel místo na kartě
+            if not resumed:
+                os.remove(self.path)
+            raise OSError(f"Cannot allocate {self.file_size / 1e9:.1f} GB "
+                          f"for frame archive {self.path}: {e}") from e
+
+        self._map('r+')
+
+        if not resumed:
+            self.header[:6] = expected
+            self.header[6] = 0
+            self.index['seq'] = -1
+            self.index['timestamp'] = 0.0
+            self.flush()
+
+        return resumed
+
+    def _map(self, mode):
+        """Namapuje header, index a frame sloty ze souboru"""
+        self.header = np.memmap(self.path, dtype='<i8', mode=mode,
+                                offset=0, shape=(HEADER_FIELDS,))
+        self.index = np.memmap(self.path, dtype=INDEX_DTYPE, mode=mode,
+                               offset=self.index_offset, shape=(self.slot_count,))
+        self.frames = np.memmap(self.path, dtype=np.uint8, mode=mode,
+                                offset=self.frames_offset,
+                                shape=(self.slot_count,) + self.frame_shape)
+
+    @classmethod
+    def open_readonly(cls, path):
+        """Otevře existující archiv pouze pro čtení (např. pro incident review)"""
+        header = np.memmap(path, dtype='<i8', mode='r', shape=(HEADER_FIELDS,))
+        if header[0] != ARCHIVE_MAGIC or header[1] != ARCHIVE_VERSION:
+            raise ValueError(f"{path} is not a frame archive")
+        slot_count, height, width, channels = (int(v) for v in header[2:6])
+        del header
+
+        archive = cls.__new__(cls)
+        archive.path = path
+        archive.slot_count = slot_count
+        archive.frame_shape = (height, width, channels)
+        archive.stride = 1
+        archive._compute_layout()
+        archive._map('r')
+        archive.next_seq = int(archive.header[6])
+        archive.write_queue = None
+        archive.writer_thread = None
+        archive.running = False
+        archive.frames_seen = 0
+        archive.frames_dropped = 0
+        archive.write_errors = 0
+        return archive
+
+    def start(self):
+        """Spustí zapisovací thread"""
+        if not self.running:
+            self.running = True
+            self.writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+            self.writer_thread.start()
+
+    def stop(self):
+        """Dopíše frontu, zastaví thread a flushne soubor na disk"""
+        if self.running:
+            self.running = False
+            try:
+                self.write_queue.put(None, timeout=2)
+            except queue.Full:
+                print("⚠️ Frame archive writer not responding - stopping without draining")
+            self.writer_thread.join(timeout=5)
+        self.flush()
+        if self.frames_dropped:
+            print(f"⚠️ Frame archive dropped {self.frames_dropped} frames (writer too slow)")
+        if self.write_errors:
+            print(f"⚠️ Frame archive failed to write {self.write_errors} frames")
+
+    def append(self, frame, timestamp):
+        """Zařadí frame k zápisu - volá capture thread, nikdy neblokuje"""
+        self.frames_seen += 1
+        if (self.frames_seen - 1) % self.stride != 0:
+            return False
+        if self.write_queue.full():
+            self.frames_dropped += 1
+            return False
+
+        # Zmenšit už tady - ve frontě nesmí při zaseknuté kartě viset plné framy (~9 MB)
+        height, width = self.frame_shape[:2]
+        if frame.shape[:2] != (height, width):
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        try:
+            self.write_queue.put_nowait((frame, timestamp))
+            return True
+        except queue.Full:
+            self.frames_dropped += 1
+            return False
+
+    def _writer_loop(self):
+        """Sekvenčně zapisuje framy do kruhového souboru"""
+        while True:
+            item = self.write_queue.get()
+            if item is None:
+                break
+            try:
+                self._write_frame(*item)
+            except Exception as e:
+                # Chyba jednoho framu nesmí zastavit thread (fronta by se zaplnila)
+                self.write_errors += 1
+                print(f"Frame archive write error: {e}")
+
+    def _write_frame(self, frame, timestamp):
+        """Zapíše jeden frame do dalšího slotu"""
+        height, width = self.frame_shape[:2]
+        if frame.shape[:2] != (height, width):
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        frame = frame.reshape(self.frame_shape)
+
+        seq = self.next_seq
+        slot = seq % self.slot_count
+
+        # Nejdřív zneplatni slot, pak zapiš data, nakonec index (čtenář kontroluje seq)
+        self.index['seq'][slot] = -1
+        self.frames[slot] = frame
+        self.index['timestamp'][slot] = timestamp
+        self.index['seq'][slot] = seq
+
+        self.next_seq = seq + 1
+        self.header[6] = self.next_seq
+
+    def flush(self):
+        """Zapíše změny na disk"""
+        if self.index.mode != 'r':
+            self.frames.flush()
+            self.index.flush()
+            self.header.flush()
+
+    def get_frames(self, start_time, end_time, copy=True):
+        """
+        Vrátí framy v časovém rozsahu seřazené podle sekvence
+        copy=True: framy se zkopírují a ověří (seqlock) - přepsané sloty se vynechají
+        copy=False: zero-copy pohledy do souboru, platnost ověř přes is_valid()
+        """
+        seqs = np.array(self.index['seq'])
+        timestamps = np.array(self.index['timestamp'])
+        slots = np.flatnonzero((seqs >= 0) & (timestamps >= start_time) & (timestamps <= end_time))
+        slots = slots[np.argsort(seqs[slots])]
+
+        result = []
+        for slot in slots:
+            frame = self.frames[slot]
+            if copy:
+                frame = frame.copy()
+                # Writer slot mezitím přepsal nebo právě přepisuje -> torn read
+                if int(self.index['seq'][slot]) != seqs[slot]:
+                    continue
+            result.append({
+                'frame': frame,
+                'timestamp': float(timestamps[slot]),
+                'frame_id': int(seqs[slot])
+            })
+        return result
+
+    def is_valid(self, frame_record):
+        """Platí záznam z get_frames ještě (slot nebyl přepsán)?"""
+        slot = frame_record['frame_id'] % self.slot_count
+        return int(self.index['seq'][slot]) == frame_record['frame_id']
+
+    def get_time_range(self):
+        """Vrátí (nejstarší, nejnovější) timestamp v archivu nebo None"""
+        valid = self.index['seq'] >= 0
+        if not np.any(valid):
+            return None
+        timestamps = self.index['timestamp'][valid]
+        return float(timestamps.min()), float(timestamps.max())
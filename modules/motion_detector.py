@@ -2,6 +2,7 @@
 
 import cv2
 import numpy as np
+from modules.detection_records import extract_blobs
 
 class SimpleMotionDetector:
     def __init__(self, coordinate_system):
@@ -32,34 +33,10 @@ class SimpleMotionDetector:
         dilate_kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
         fg_mask = cv2.dilate(fg_mask, dilate_kernel, iterations=1)
         
-        # Find contours
-        contours, _ = cv2.findContours(fg_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        detections = []
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            
-            # Filtr velikosti
-            if self.min_contour_area < area < self.max_contour_area:
-                x, y, w, h = cv2.boundingRect(contour)
-                center_x = x + w // 2
-                center_y = y + h // 2
-                
-                # Filtr aspect ratio
-                aspect_ratio = max(w, h) / min(w, h) if min(w, h) > 0 else 0
-                if aspect_ratio > 5:
-                    continue
-                
-                # 🎯 KONTROLA PRE-DETECTION POLYGONŮ
-                if self.coord_system.is_in_predetection_area(center_x, center_y):
-                    world_pos = self.coord_system.pixel_to_world(center_x, center_y)
-                    
-                    detections.append({
-                        'bbox': (x, y, w, h),
-                        'center': (center_x, center_y),
-                        'world_pos': world_pos,
-                        'area': area,
-                        'aspect_ratio': aspect_ratio
-                    })
+        # Bloby - filtr velikosti, aspect ratio a pre-detection polygonů najednou
+        detections = extract_blobs(
+            fg_mask, self.coord_system, self.min_contour_area, self.max_contour_area,
+            max_aspect=5
+        )
         
         return detections, fg_mask
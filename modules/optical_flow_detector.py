@@ -2,6 +2,9 @@
 
 import cv2
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import CAMERA_SETTINGS, TILE_SETTINGS
+from modules.detection_records import extract_blobs, empty_detections
 
 class OpticalFlowDetector:
     def __init__(self, coordinate_system):
@@ -34,33 +37,132 @@ class OpticalFlowDetector:
         self.min_area = 3000
         self.max_area = 40000
         
+        # Zpracovací rozlišení (1.0 = plné, řídí QualityController)
+        self.scale = 1.0
+        
+        # Dlaždice kolem pre-detection zón zpracované v thread poolu
+        self.tiles = self._build_tiles() if TILE_SETTINGS['enabled'] else []
+        self.executor = None
+        if len(self.tiles) > 1:
+            workers = min(TILE_SETTINGS['workers'], len(self.tiles))
+            self.executor = ThreadPoolExecutor(max_workers=workers)
+        
         print("✓ Optical Flow Detector initialized")
+        if self.tiles:
+            print(f"✓ Tile-parallel processing: {len(self.tiles)} tiles")
+    
+    def set_quality(self, max_corners, max_level, scale):
+        """Nastaví parametry kvality (počet featur, pyramida LK, rozlišení)"""
+        self.feature_params['maxCorners'] = max_corners
+        self.lk_params['maxLevel'] = max_level
+        self.scale = scale
+    
+    def _build_tiles(self):
+        """Obdélníky (x0, y0, x1, y1) kolem pre-detection zón, překryvy sloučené"""
+        width, height = CAMERA_SETTINGS['resolution']
+        halo = TILE_SETTINGS['halo_px']
+        
+        tiles = []
+        for poly in self.coord_system.get_predetection_polygons():
+            x, y, w, h = cv2.boundingRect(poly)
+            tiles.append([max(0, x - halo), max(0, y - halo),
+                          min(width, x + w + halo), min(height, y + h + halo)])
+        
+        # Překrývající se dlaždice slouč, aby se žádný blob nedetekoval dvakrát
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(tiles)):
+                for j in range(i + 1, len(tiles)):
+                    a, b = tiles[i], tiles[j]
+                    if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                        tiles[i] = [min(a[0], b[0]), min(a[1], b[1]),
+                                    max(a[2], b[2]), max(a[3], b[3])]
+                        del tiles[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+        
+        # Deterministické pořadí pro merge výsledků
+        return sorted(tuple(t) for t in tiles)
     
     def detect_moving_vehicles(self, frame):
         """Detekuje pouze POHYBUJÍCÍ SE vozidla pomocí optical flow"""
         gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+        scale = self.scale
+        if scale != 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
         
         # První frame - inicializace
         if self.prev_gray is None:
             self.prev_gray = gray
-            self.prev_points = cv2.goodFeaturesToTrack(gray, mask=None, **self.feature_params)
-            return [], np.zeros_like(gray)
+            return empty_detections(), np.zeros_like(gray)
+        
+        # Změna rozlišení (QualityController) - přeškáluj předchozí frame, ať se frame neztratí
+        if self.prev_gray.shape != gray.shape:
+            self.prev_gray = cv2.resize(self.prev_gray, (gray.shape[1], gray.shape[0]),
+                                        interpolation=cv2.INTER_AREA)
+        
+        if not self.tiles:
+            detections, motion_mask, points = self._process_region(
+                self.prev_gray, gray, (0, 0), self.feature_params['maxCorners']
+            )
+            self.prev_gray = gray
+            self.prev_points = points
+            return detections, motion_mask
+        
+        # Dlaždice v zpracovacím rozlišení (pohledy, bez kopírování)
+        regions = []
+        for x0, y0, x1, y1 in self.tiles:
+            sx0, sy0 = int(x0 * scale), int(y0 * scale)
+            sx1, sy1 = int(x1 * scale), int(y1 * scale)
+            regions.append((sx0, sy0, sx1, sy1))
+        
+        # Rozpočet featur se dělí mezi dlaždice
+        max_corners = max(1, self.feature_params['maxCorners'] // len(regions))
+        jobs = [(self.prev_gray[y0:y1, x0:x1], gray[y0:y1, x0:x1], (x0, y0), max_corners)
+                for x0, y0, x1, y1 in regions]
+        
+        if self.executor:
+            results = list(self.executor.map(lambda job: self._process_region(*job), jobs))
+        else:
+            results = [self._process_region(*job) for job in jobs]
+        
+        # Merge v pevném pořadí dlaždic
+        motion_mask = np.zeros_like(gray)
+        all_detections = []
+        all_points = []
+        for (x0, y0, x1, y1), (detections, tile_mask, points) in zip(regions, results):
+            motion_mask[y0:y1, x0:x1] = tile_mask
+            all_detections.append(detections)
+            if points is not None:
+                all_points.append(points + np.array([x0, y0], dtype=np.float32))
+        
+        self.prev_gray = gray
+        self.prev_points = np.concatenate(all_points) if all_points else None
+        
+        return np.concatenate(all_detections), motion_mask
+    
+    def _process_region(self, prev_gray, gray, offset, max_corners):
+        """Feature detekce, optical flow, morfologie a bloby pro jeden region
+        Vrátí (detekce, motion mask regionu, feature pointy v souřadnicích regionu)"""
+        scale = self.scale
+        feature_params = dict(self.feature_params, maxCorners=max_corners)
         
         # Najdi nové feature pointy
-        curr_points = cv2.goodFeaturesToTrack(gray, mask=None, **self.feature_params)
+        curr_points = cv2.goodFeaturesToTrack(gray, mask=None, **feature_params)
         
         if curr_points is None or len(curr_points) == 0:
-            self.prev_gray = gray
-            return [], np.zeros_like(gray)
+            return empty_detections(), np.zeros_like(gray), None
         
         # Spočítej optical flow
         next_points, status, error = cv2.calcOpticalFlowPyrLK(
-            self.prev_gray, gray, curr_points, None, **self.lk_params
+            prev_gray, gray, curr_points, None, **self.lk_params
         )
         
         if next_points is None:
-            self.prev_gray = gray
-            return [], np.zeros_like(gray)
+            return empty_detections(), np.zeros_like(gray), curr_points
         
         # Vytvoř motion magnitude mapu
         motion_magnitude = np.zeros_like(gray, dtype=np.float32)
@@ -72,56 +174,37 @@ class OpticalFlowDetector:
             a, b = new.ravel()
             c, d = old.ravel()
             
-            # Vypočítej magnitude pohybu
-            magnitude = np.sqrt((a - c)**2 + (b - d)**2)
+            # Vypočítej magnitude pohybu (px/frame v plném rozlišení)
+            magnitude = np.sqrt((a - c)**2 + (b - d)**2) / scale
             
             # Zakresli do motion mapy pouze pokud je pohyb větší než threshold
             if magnitude > self.motion_threshold:
                 # 🎯 OPRAVA: Použij int() pro magnitude
-                cv2.circle(motion_magnitude, (int(a), int(b)), 15, int(magnitude * 10), -1)
+                cv2.circle(motion_magnitude, (int(a), int(b)), max(1, int(15 * scale)),
+                           int(magnitude * 10), -1)
         
         # Threshold a morfologické operace
         motion_mask = (motion_magnitude > (self.motion_threshold * 10)).astype(np.uint8) * 255
         
         # Morfologické operace pro spojení blízkých pohybů
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (21, 21))
+        close_size = self._scaled_kernel_size(21, scale)
+        open_size = self._scaled_kernel_size(9, scale)
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (close_size, close_size))
         motion_mask = cv2.morphologyEx(motion_mask, cv2.MORPH_CLOSE, kernel)
         motion_mask = cv2.morphologyEx(motion_mask, cv2.MORPH_OPEN, 
-                                       cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (9, 9)))
-        
-        # Najdi contours pohybujících se oblastí
-        contours, _ = cv2.findContours(motion_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+                                       cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (open_size, open_size)))
         
-        detections = []
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            
-            if self.min_area < area < self.max_area:
-                x, y, w, h = cv2.boundingRect(contour)
-                center_x = x + w // 2
-                center_y = y + h // 2
-                
-                # Kontrola pre-detection oblasti
-                if self.coord_system.is_in_predetection_area(center_x, center_y):
-                    world_pos = self.coord_system.pixel_to_world(center_x, center_y)
-                    
-                    # Vypočítej průměrnou rychlost pohybu v této oblasti
-                    mask_roi = motion_mask[y:y+h, x:x+w]
-                    if np.sum(mask_roi > 0) > 0:
-                        avg_motion = np.mean(motion_magnitude[y:y+h, x:x+w][mask_roi > 0]) / 10.0
-                    else:
-                        avg_motion = 0.0
-                    
-                    detections.append({
-                        'bbox': (x, y, w, h),
-                        'center': (center_x, center_y),
-                        'world_pos': world_pos,
-                        'area': area,
-                        'motion_magnitude': avg_motion
-                    })
-        
-        # Update pro další frame
-        self.prev_gray = gray
-        self.prev_points = curr_points
+        # Bloby pohybujících se oblastí - filtrace velikosti a zón najednou
+        detections = extract_blobs(
+            motion_mask, self.coord_system, self.min_area, self.max_area,
+            motion_map=motion_magnitude, scale=scale, offset=offset
+        )
+        detections['motion'] /= 10.0
         
-        return detections, motion_mask
+        return detections, motion_mask, curr_points
+    
+    @staticmethod
+    def _scaled_kernel_size(size, scale):
+        """Velikost morfologického kernelu pro zmenšené rozlišení (liché číslo)"""
+        scaled = max(3, int(size * scale))
+        return scaled if scaled % 2 == 1 else scaled + 1
@@ -0,0 +1,135 @@
+# modules/parameter_sweep.py
+"""
+Offline sweep parametrů SpeedCalculatoru nad detection logem
+Použití: python -m modules.parameter_sweep logs/detections.bin \
+             --param crossing_cooldown=0.2,0.3,0.5 --param trigger_threshold=30,40,50
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from modules.coordinate_system import CoordinateSystem
+from modules.detection_log import DetectionLog
+from modules.speed_calculator import SpeedCalculator
+
+# Atributy SpeedCalculatoru, které lze ladit
+TUNABLE_PARAMS = (
+    'crossing_cooldown', 'trigger_threshold', 'min_time_diff',
+    'min_reasonable_speed', 'max_reasonable_speed', 'speed_limit_kmh'
+)
+
+# Stav worker procesu - log a souřadnicový systém se načtou jednou na proces
+_worker = {}
+
+def select_frame_detections(records):
+    """Z každého framu vezme největší detekci - stejně jako live smyčka v main.py
+    Frame = (timestamp, frame_index): frame_index začíná v každé session znovu od 1,
+    a SpeedCalculator potřebuje záznamy seřazené podle času"""
+    if len(records) == 0:
+        return np.empty((0, 2), dtype=np.int32), np.empty(0, dtype=np.float64)
+    order = np.lexsort((-records['area'], records['frame_index'], records['timestamp']))
+    sorted_times = records['timestamp'][order]
+    sorted_frames = records['frame_index'][order]
+    new_frame = (sorted_times[1:] != sorted_times[:-1]) | (sorted_frames[1:] != sorted_frames[:-1])
+    first = np.flatnonzero(np.r_[True, new_frame])
+    chosen = order[first]
+    return np.asarray(records['center'][chosen]), np.asarray(records['timestamp'][chosen])
+
+def _init_worker(log_path, homography_file):
+    """Inicializace worker procesu"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        coord_system = CoordinateSystem(homography_file)
+    centers, timestamps = select_frame_detections(DetectionLog.load(log_path))
+    _worker['coord_system'] = coord_system
+    _worker['center_array'] = centers
+    _worker['centers'] = [(int(x), int(y)) for x, y in centers]
+    _worker['timestamps'] = timestamps.tolist()
+
+def run_config(params):
+    """Přehraje log přes SpeedCalculator s danými parametry a vrátí souhrn"""
+    calculator = SpeedCalculator(_worker['coord_system'])
+    for name, value in params.items():
+        setattr(calculator, name, value)
+
+    # Čáry a pruhy pro celý log jedním vektorovým voláním (threshold se sweepuje)
+    crossed, lanes = _worker['coord_system'].evaluate_crossings(
+        _worker['center_array'], threshold=calculator.trigger_threshold
+    )
+
+    speeds = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for center, timestamp, line_index, lane_index in zip(
+                _worker['centers'], _worker['timestamps'], crossed.tolist(), lanes.tolist()):
+            speed_data = calculator.update_position(
+                center, timestamp, line_index=line_index, lane_index=lane_index
+            )
+            if speed_data:
+                speeds.append(speed_data['speed_kmh'])
+
+    speeds = np.array(speeds)
+    return {
+        **params,
+        'started': calculator.get_vehicle_count(),
+        'measured': len(speeds),
+        'mean_kmh': float(speeds.mean()) if len(speeds) else 0.0,
+        'std_kmh': float(speeds.std()) if len(speeds) else 0.0,
+        'speeding': int(np.sum(speeds > calculator.speed_limit_kmh))
+    }
+
+def build_grid(param_specs):
+    """'name=v1,v2,...' -> seznam dictů se všemi kombinacemi"""
+    names, values = [], []
+    for spec in param_specs:
+        name, _, raw = spec.partition('=')
+        if not raw or name not in TUNABLE_PARAMS:
+            raise ValueError(f"Invalid parameter spec: {spec}")
+        names.append(name)
+        values.append([float(v) for v in raw.split(',')])
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+def run_sweep(log_path, grid, homography_file="config/homography_matrix.txt", workers=None):
+    """Spustí všechny konfigurace paralelně, výsledky v pořadí gridu"""
+    workers = workers or os.cpu_count()
+    chunksize = max(1, len(grid) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(log_path, homography_file)) as executor:
+        return list(executor.map(run_config, grid, chunksize=chunksize))
+
+def main():
+    parser = argparse.ArgumentParser(description="Parameter sweep over a detection log")
+    parser.add_argument('log', help="Detection log file")
+    parser.add_argument('--param', action='append', default=[],
+                        help="SpeedCalculator attribute and values, e.g. crossing_cooldown=0.2,0.3")
+    parser.add_argument('--homography', default="config/homography_matrix.txt")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--csv', help="Write all results to CSV")
+    args = parser.parse_args()
+
+    grid = build_grid(args.param) if args.param else [{}]
+    records = DetectionLog.load(args.log)
+    print(f"🔄 Sweeping {len(grid)} configurations over {len(records)} detections...")
+
+    results = run_sweep(args.log, grid, args.homography, args.workers)
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0].keys()))
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"✓ Results written to {args.csv}")
+
+    print(f"\n{'='*60}")
+    for result in results:
+        print("  ".join(f"{k}={v:.3g}" if isinstance(v, float) else f"{k}={v}"
+                        for k, v in result.items()))
+    print(f"{'='*60}\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# modules/quality_controller.py
+
+import time
+from collections import deque
+
+from config.settings import CAMERA_SETTINGS, QUALITY_SETTINGS
+
+class QualityController:
+    def __init__(self, detector, settings=None):
+        """Snižuje kvalitu detekce když smyčka nestíhá frame budget"""
+        self.detector = detector
+        self.settings = dict(QUALITY_SETTINGS if settings is None else settings)
+
+        self.levels = self.settings['levels']
+        self.frame_budget = self.settings['frame_budget_s'] or 1.0 / CAMERA_SETTINGS['fps']
+        self.enabled = self.settings['enabled']
+
+        # Aktuální stav
+        self.level = 0
+        self.avg_frame_time = 0.0
+        self.last_frame_time = 0.0
+        self.pinned = False  # Vozidlo v zóně nebo probíhá měření => plná kvalita
+        self.measuring_since = None
+        self.measuring_pin_expired = False
+
+        # Hystereze
+        self.over_budget_frames = 0
+        self.under_budget_frames = 0
+
+        # Log rozhodnutí pro korelaci s kvalitou měření
+        self.decisions = deque(maxlen=500)
+
+        self._apply_level()
+        print(f"✓ Quality controller: budget {self.frame_budget*1000:.1f} ms, "
+              f"{len(self.levels)} levels")
+
+    def update(self, frame_time, vehicle_in_zone=False, measuring=False, timestamp=None):
+        """Zaznamená dobu zpracování framu a případně změní úroveň kvality
+        frame_time: Doba celé iterace smyčky (detekce + zobrazení)
+        measuring: SpeedCalculator je ve stavu MEASURING (pin s timeoutem)"""
+        timestamp = time.time() if timestamp is None else timestamp
+        alpha = self.settings['ema_alpha']
+        self.last_frame_time = frame_time
+        if self.avg_frame_time == 0.0:
+            self.avg_frame_time = frame_time
+        else:
+            self.avg_frame_time = alpha * frame_time + (1 - alpha) * self.avg_frame_time
+
+        if not self.enabled:
+            return self.level
+
+        # 🎯 Během měření vždy plná kvalita - s timeoutem pro zaseklé MEASURING
+        measuring_pin = self._measuring_pin(measuring, timestamp)
+        if vehicle_in_zone or measuring_pin:
+            self.pinned = True
+            self.over_budget_frames = 0
+            self.under_budget_frames = 0
+            if self.level != 0:
+                reason = 'vehicle in zone' if vehicle_in_zone else 'measurement in progress'
+                self._set_level(0, reason)
+            return self.level
+        self.pinned = False
+
+        # Na stride úrovních má zpracovaný frame k dispozici víc času
+        budget = self._level_budget()
+        if self.avg_frame_time > budget * self.settings['degrade_ratio']:
+            self.over_budget_frames += 1
+            self.under_budget_frames = 0
+        elif self.avg_frame_time < budget * self.settings['recover_ratio']:
+            self.under_budget_frames += 1
+            self.over_budget_frames = 0
+        else:
+            self.over_budget_frames = 0
+            self.under_budget_frames = 0
+
+        hold = self.settings['hold_frames']
+        if self.over_budget_frames >= hold and self.level < len(self.levels) - 1:
+            self._set_level(self.level + 1, 'over frame budget')
+        elif self.under_budget_frames >= hold and self.level > 0:
+            self._set_level(self.level - 1, 'under frame budget')
+
+        return self.level
+
+    def _measuring_pin(self, measuring, timestamp):
+        """Pin během měření, uvolněný po measuring_pin_timeout_s"""
+        if not measuring:
+            self.measuring_since = None
+            self.measuring_pin_expired = False
+            return False
+
+        if self.measuring_since is None:
+            self.measuring_since = timestamp
+        if timestamp - self.measuring_since < self.settings['measuring_pin_timeout_s']:
+            return True
+
+        if not self.measuring_pin_expired:
+            self.measuring_pin_expired = True
+            self._log_decision(self.level, self.level, 'measurement pin timed out')
+        return False
+
+    def _level_budget(self):
+        """Časový budget jednoho zpracovaného framu na aktuální úrovni"""
+        return self.frame_budget * self.levels[self.level]['stride']
+
+    def should_process(self, frame_count):
+        """Frame stride - na nižších úrovních se zpracuje jen každý N-tý frame"""
+        if self.pinned:
+            return True
+        return frame_count % self.get_params()['stride'] == 0
+
+    def _set_level(self, new_level, reason):
+        """Přepne úroveň kvality a zaloguje rozhodnutí"""
+        old_level = self.level
+        budget = self._level_budget()
+        self.level = new_level
+        self.over_budget_frames = 0
+        self.under_budget_frames = 0
+        self._apply_level()
+        self._log_decision(old_level, new_level, reason, budget)
+
+    def _log_decision(self, old_level, new_level, reason, budget=None):
+        """Zaloguje rozhodnutí controlleru"""
+        budget = self._level_budget() if budget is None else budget
+        decision = {
+            'timestamp': time.time(),
+            'from_level': old_level,
+            'to_level': new_level,
+            'reason': reason,
+            'avg_frame_ms': self.avg_frame_time * 1000,
+            'budget_ms': budget * 1000,
+            'params': dict(self.levels[new_level])
+        }
+        self.decisions.append(decision)
+
+        if new_level > old_level:
+            arrow = '⬇️'
+        elif new_level < old_level:
+            arrow = '⬆️'
+        else:
+            arrow = '⏱️'
+        print(f"{arrow} Quality L{old_level} → L{new_level} ({reason}, "
+              f"avg {decision['avg_frame_ms']:.1f}/{decision['budget_ms']:.1f} ms)")
+
+    def _apply_level(self):
+        """Nastaví parametry detektoru podle aktuální úrovně"""
+        params = self.levels[self.level]
+        self.detector.set_quality(
+            max_corners=params['max_corners'],
+            max_level=params['max_level'],
+            scale=params['scale']
+        )
+
+    def get_params(self):
+        """Vrátí parametry aktuální úrovně"""
+        return self.levels[self.level]
+
+    def get_level(self):
+        """Vrátí aktuální úroveň kvality (0 = plná)"""
+        return self.level
+
+    def get_decisions(self):
+        """Vrátí log rozhodnutí o změně kvality"""
+        return list(self.decisions)
+
+    def get_status(self):
+        """Vrátí aktuální stav controlleru"""
+        return {
+            'level': self.level,
+            'pinned': self.pinned,
+            'avg_frame_ms': self.avg_frame_time * 1000,
+            'last_frame_ms': self.last_frame_time * 1000,
+            'budget_ms': self._level_budget() * 1000,
+            'params': dict(self.levels[self.level])
+        }
@@ -2,42 +2,60 @@
 
 import time
 import numpy as np
+from config.settings import MEASUREMENT_SEGMENTS
 
 class SpeedCalculator:
-    def __init__(self, coordinate_system):
+    def __init__(self, coordinate_system, segments=None):
         """Zjednodušený speed calculator pro JEDNO vozidlo"""
         self.coord_system = coordinate_system
         
+        # Měřené úseky (dvojice čar), volitelně omezené na pruhy
+        self.segments = MEASUREMENT_SEGMENTS if segments is None else segments
+        lines = coordinate_system.get_trigger_line_coordinates()
+        for segment in self.segments:
+            for line in segment['lines']:
+                if line not in lines:
+                    raise ValueError(f"Segment {segment['name']} uses unknown line {line}")
+            coordinate_system.validate_lane_names(
+                segment.get('lanes') or [], f"Segment {segment['name']}"
+            )
+        
         # State machine pro měření
         self.state = 'IDLE'  # IDLE, MEASURING, MEASURED
         
         # Data aktuálního vozidla
         self.current_vehicle = {
-            'first_line': None,
-            'first_time': None,
-            'first_world_pos': None,
-            'second_line': None,
-            'second_time': None,
-            'second_world_pos': None
+            'crossings': [],  # [{'line', 'time', 'world_pos'}, ...] v pořadí průjezdu
+            'lane': None
         }
         
         # Statistiky
         self.vehicle_count = 0
         self.speed_limit_kmh = 50
         self.max_reasonable_speed = 80
+        self.min_reasonable_speed = 5
+        self.min_time_diff = 0.1  # Kratší průjezd = chyba
+        self.trigger_threshold = 40  # Pixely od trigger line
         
         # Anti-bounce - aby se jeden crossing nezapočítal 2x
         self.last_crossing_time = 0
         self.crossing_cooldown = 0.3  # 300ms mezi crossingy
         
-    def update_position(self, center_pixel, timestamp):
-        """Aktualizuje pozici a kontroluje trigger lines"""
-        world_pos = self.coord_system.pixel_to_world(center_pixel[0], center_pixel[1])
-        
-        # Kontrola trigger lines
-        trigger_line = self.coord_system.which_trigger_line_crossed(
-            center_pixel[0], center_pixel[1], threshold=40
-        )
+    def update_position(self, center_pixel, timestamp, line_index=None, lane_index=None,
+                        world_pos=None):
+        """Aktualizuje pozici a kontroluje trigger lines
+        line_index/lane_index: výsledek CoordinateSystem.evaluate_crossings pro tuto detekci
+        (volající ho počítá pro všechny detekce framu najednou); bez nich se spočítá zde"""
+        if world_pos is None:
+            world_pos = self.coord_system.pixel_to_world(center_pixel[0], center_pixel[1])
+        
+        if line_index is None or lane_index is None:
+            crossed, lanes = self.coord_system.evaluate_crossings(
+                [center_pixel], threshold=self.trigger_threshold
+            )
+            line_index, lane_index = crossed[0], lanes[0]
+        trigger_line = self.coord_system.get_line_name(line_index)
+        lane = self.coord_system.get_lane_name(lane_index)
         
         if trigger_line:
             # Anti-bounce: ignoruj další crossingy po dobu cooldownu
@@ -48,104 +66,155 @@ class SpeedCalculator:
             
             # Zpracování podle stavu
             if self.state == 'IDLE':
-                # První crossing - začni měření
-                self._start_measurement(trigger_line, timestamp, world_pos)
+                # První crossing - začni měření, ale jen na krajní čáře úseku
+                if self._is_entry_line(trigger_line, lane):
+                    self._start_measurement(trigger_line, timestamp, world_pos, lane)
                 
             elif self.state == 'MEASURING':
-                # Druhý crossing - pokud je to JINÁ linie
-                if trigger_line != self.current_vehicle['first_line']:
-                    speed_data = self._finish_measurement(trigger_line, timestamp, world_pos)
-                    return speed_data
+                # Další crossing - jen JINÁ linie dál ve směru jízdy
+                if self._is_ahead(trigger_line):
+                    return self._add_crossing(trigger_line, timestamp, world_pos)
         
         return None
     
-    def _start_measurement(self, trigger_line, timestamp, world_pos):
+    def _segment_lines(self, lane):
+        """Čáry všech úseků platných pro daný pruh"""
+        lines = set()
+        for segment in self.segments:
+            if segment.get('lanes') is None or lane in segment['lanes']:
+                lines.update(segment['lines'])
+        return lines
+    
+    def _world_y(self, line):
+        return self.coord_system.get_trigger_line_coordinates()[line]['world_y']
+    
+    def _is_entry_line(self, line, lane):
+        """Vozidlo může začít jen na krajní čáře úseků (ne na mezilehlé)"""
+        lines = self._segment_lines(lane)
+        if line not in lines:
+            return False
+        world_ys = [self._world_y(l) for l in lines]
+        return self._world_y(line) in (min(world_ys), max(world_ys))
+    
+    def _is_ahead(self, line):
+        """Je čára dál ve směru jízdy než poslední překročená?"""
+        crossings = self.current_vehicle['crossings']
+        last_y = self._world_y(crossings[-1]['line'])
+        first_y = self._world_y(crossings[0]['line'])
+        line_y = self._world_y(line)
+        if line_y == last_y:
+            return False
+        if len(crossings) == 1:
+            return True
+        # Směr je daný prvními dvěma crossingy
+        return (line_y - last_y) * (last_y - first_y) > 0
+    
+    def _start_measurement(self, trigger_line, timestamp, world_pos, lane=None):
         """Zahájí měření vozidla"""
         self.state = 'MEASURING'
         self.vehicle_count += 1
         
         self.current_vehicle = {
-            'first_line': trigger_line,
-            'first_time': timestamp,
-            'first_world_pos': world_pos,
-            'second_line': None,
-            'second_time': None,
-            'second_world_pos': None
+            'crossings': [{'line': trigger_line, 'time': timestamp, 'world_pos': world_pos}],
+            'lane': lane
         }
         
         print(f"🏁 Vehicle #{self.vehicle_count} crossed {trigger_line.upper()}")
     
-    def _finish_measurement(self, trigger_line, timestamp, world_pos):
-        """Dokončí měření a vypočítá rychlost"""
-        self.current_vehicle['second_line'] = trigger_line
-        self.current_vehicle['second_time'] = timestamp
-        self.current_vehicle['second_world_pos'] = world_pos
-        
+    def _add_crossing(self, trigger_line, timestamp, world_pos):
+        """Zaznamená crossing, spočítá rychlost na uzavřených úsecích a
+        měření ukončí až na poslední čáře ve směru jízdy"""
         print(f"🏁 Vehicle #{self.vehicle_count} crossed {trigger_line.upper()}")
         
-        # Výpočet rychlosti
-        time_diff = self.current_vehicle['second_time'] - self.current_vehicle['first_time']
-        
-        if time_diff <= 0.1:  # Příliš rychlé - chyba
+        crossing = {'line': trigger_line, 'time': timestamp, 'world_pos': world_pos}
+        lane = self.current_vehicle['lane']
+        
+        # Úseky, které tento crossing uzavírá (s libovolným dřívějším crossingem)
+        results = []
+        for previous in self.current_vehicle['crossings']:
+            for segment in self.segments:
+                if segment.get('lanes') is not None and lane not in segment['lanes']:
+                    continue
+                if set(segment['lines']) == {previous['line'], trigger_line}:
+                    speed_data = self._segment_speed(segment['name'], previous, crossing)
+                    if speed_data:
+                        results.append(speed_data)
+        
+        self.current_vehicle['crossings'].append(crossing)
+        
+        # Konec měření, pokud už ve směru jízdy žádná další čára úseku není
+        first_y = self._world_y(self.current_vehicle['crossings'][0]['line'])
+        line_y = self._world_y(trigger_line)
+        if not any((self._world_y(l) - line_y) * (line_y - first_y) > 0
+                   for l in self._segment_lines(lane)):
             self._reset_measurement()
+        
+        if not results:
+            return None
+        
+        # Hlavní výsledek = nejdelší úsek, ostatní v 'segments'
+        speed_data = dict(max(results, key=lambda r: r['distance_m']))
+        speed_data['segments'] = results
+        return speed_data
+    
+    def _segment_speed(self, segment_name, first, second):
+        """Vypočítá rychlost mezi dvěma crossingy"""
+        time_diff = second['time'] - first['time']
+        
+        if time_diff <= self.min_time_diff:  # Příliš rychlé - chyba
             return None
         
         # Vzdálenost pomocí homografie
         distance = self.coord_system.calculate_distance(
-            self.current_vehicle['first_world_pos'],
-            self.current_vehicle['second_world_pos']
+            first['world_pos'], second['world_pos']
         )
         
         speed_ms = distance / time_diff
         speed_kmh = speed_ms * 3.6
         
         # Filtr nesmyslných rychlostí
-        if speed_kmh > self.max_reasonable_speed or speed_kmh < 5:
+        if speed_kmh > self.max_reasonable_speed or speed_kmh < self.min_reasonable_speed:
             print(f"⚠️ Unreasonable speed {speed_kmh:.1f} km/h - ignored")
-            self._reset_measurement()
             return None
         
-        # Směr
-        if self.current_vehicle['first_line'] == 'start_line':
+        # Směr podle world_y čar (rostoucí = START → END)
+        if self._world_y(second['line']) > self._world_y(first['line']):
             direction = '→'  # START → END
         else:
             direction = '←'  # END → START
         
+        lane = self.current_vehicle['lane']
+        
         # 🎯 HLAVNÍ VÝPIS RYCHLOSTI
         print(f"\n{'='*60}")
         print(f"🚗 Vehicle #{self.vehicle_count}: {speed_kmh:.1f} km/h {direction}")
-        print(f"   Route: {self.current_vehicle['first_line']} → {self.current_vehicle['second_line']}")
+        print(f"   Route: {first['line']} → {second['line']} ({segment_name})")
+        if lane:
+            print(f"   Lane: {lane}")
         print(f"   Time: {time_diff:.2f}s")
         print(f"   Distance: {distance:.2f}m")
         if speed_kmh > self.speed_limit_kmh:
             print(f"   ⚠️ SPEEDING! (limit: {self.speed_limit_kmh} km/h)")
         print(f"{'='*60}\n")
         
-        speed_data = {
+        return {
             'vehicle_number': self.vehicle_count,
+            'segment': segment_name,
             'speed_kmh': speed_kmh,
             'speed_ms': speed_ms,
             'distance_m': distance,
             'time_s': time_diff,
             'direction': direction,
+            'lane': lane,
             'is_speeding': speed_kmh > self.speed_limit_kmh
         }
-        
-        # Reset pro další vozidlo
-        self._reset_measurement()
-        
-        return speed_data
     
     def _reset_measurement(self):
         """Resetuj stav pro další vozidlo"""
         self.state = 'IDLE'
         self.current_vehicle = {
-            'first_line': None,
-            'first_time': None,
-            'first_world_pos': None,
-            'second_line': None,
-            'second_time': None,
-            'second_world_pos': None
+            'crossings': [],
+            'lane': None
         }
     
     def get_state(self):